@@ -1,11 +1,21 @@
 
 from __future__ import annotations
 import uuid
+from bisect import bisect_left, bisect_right
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
+from itertools import accumulate
+from operator import add
+from typing import List, Dict, Optional, Any, Callable, Tuple
 
 
-@dataclass
+# Track fields that make up the keyword search haystack
+SEARCH_FIELDS = frozenset({"title", "artist", "file_path"})
+# Track fields whose values (tags / custom field keys) are tallied per library
+COUNTED_FIELDS = frozenset({"tags", "custom_fields"})
+
+
+@dataclass(slots=True)
 class Track:
     id: str
     title: str = ""
@@ -19,27 +29,403 @@ class Track:
     # Custom metadata fields - extensible dictionary for user-defined tags
     custom_fields: Dict[str, Any] = field(default_factory=dict)
     tags: List[str] = field(default_factory=list)
+    # Owning library, notified on field changes so its cached views stay fresh
+    _library: Optional["Library"] = field(default=None, init=False, repr=False, compare=False)
+    # Lazily built lowercased search fields and haystack
+    _lowered: Optional[Tuple[str, str, str]] = field(default=None, init=False, repr=False, compare=False)
+    _search_text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    # Lazily built API representation, dropped on any field change
+    _api_dict: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+
+    def __init__(
+        self,
+        id: str,
+        title: str = "",
+        artist: str = "",
+        file_path: Optional[str] = None,
+        bpm: Optional[float] = None,
+        key: Optional[str] = None,
+        year: Optional[int] = None,
+        duration_seconds: Optional[int] = None,
+        genre: Optional[str] = None,
+        custom_fields: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None,
+    ) -> None:
+        # Written out instead of generated so construction stores the slots
+        # directly; a new track has no library or caches for __setattr__ to
+        # notify, and imports build one per row.
+        init = object.__setattr__
+        init(self, "_library", None)
+        init(self, "_lowered", None)
+        init(self, "_search_text", None)
+        init(self, "_api_dict", None)
+        init(self, "id", id)
+        init(self, "title", title)
+        init(self, "artist", artist)
+        init(self, "file_path", file_path)
+        init(self, "bpm", bpm)
+        init(self, "key", key)
+        init(self, "year", year)
+        init(self, "duration_seconds", duration_seconds)
+        init(self, "genre", genre)
+        init(self, "custom_fields", {} if custom_fields is None else custom_fields)
+        init(self, "tags", [] if tags is None else tags)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+            return
+        # copy/pickle restore the slots one by one through setattr, so the
+        # private slots may not be set yet
+        lib = getattr(self, "_library", None)
+        if lib is not None and name in COUNTED_FIELDS:
+            lib._recount(name, getattr(self, name), value)
+        object.__setattr__(self, name, value)
+        # Only clear caches that were built; a fresh track has none
+        if getattr(self, "_api_dict", None) is not None:
+            object.__setattr__(self, "_api_dict", None)
+        if name in SEARCH_FIELDS and getattr(self, "_lowered", None) is not None:
+            object.__setattr__(self, "_lowered", None)
+            object.__setattr__(self, "_search_text", None)
+        if lib is not None:
+            lib.invalidate()
+
+    @property
+    def lowered_fields(self) -> Tuple[str, str, str]:
+        """Lowercased (title, artist, file_path), computed once per change."""
+        lowered = self._lowered
+        if lowered is None:
+            lowered = (
+                (self.title or "").lower(),
+                (self.artist or "").lower(),
+                (self.file_path or "").lower(),
+            )
+            self._lowered = lowered
+        return lowered
+
+    @property
+    def search_text(self) -> str:
+        """Lowercased "title artist file_path" haystack for keyword matching."""
+        text = self._search_text
+        if text is None:
+            text = " ".join(self.lowered_fields)
+            self._search_text = text
+        return text
+
+    @property
+    def api_dict(self) -> Dict[str, Any]:
+        """Track as returned by the tracks API, built once per change.
+
+        ``custom_fields`` and ``tags`` are shared, not copied, so in-place
+        edits to them show up too. Callers must not mutate the dict.
+        """
+        data = self._api_dict
+        if data is None:
+            data = {
+                "id": self.id,
+                "title": self.title,
+                "artist": self.artist,
+                "file_path": self.file_path,
+                "bpm": self.bpm,
+                "key": self.key,
+                "year": self.year,
+                "duration_seconds": self.duration_seconds,
+                "genre": self.genre,
+                "custom_fields": self.custom_fields,
+                "tags": self.tags,
+            }
+            self._api_dict = data
+        return data
+
+
+class PackedStrings:
+    """A list of strings joined into one newline-separated string.
+
+    Finding every string that contains a substring is then a single
+    C-level str.find pass over the blob instead of a Python loop over the
+    list. Hits that straddle two strings are discarded. The per-string
+    offsets are only built once a search has a hit, so a needle that
+    occurs nowhere costs the join and one find.
+    """
+
+    def __init__(self, texts: List[str]):
+        self.count = len(texts)
+        self.blob = "\n".join(texts)
+        # Kept until the offsets are built, then dropped
+        self._texts: Optional[List[str]] = texts
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    def _offsets(self) -> Tuple[List[int], List[int]]:
+        texts = self._texts
+        if texts is not None:
+            lengths = list(map(len, texts))
+            if lengths:
+                # Each string is followed by one separator
+                self._starts = list(accumulate(map((1).__add__, lengths[:-1]), initial=0))
+                self._ends = list(map(add, self._starts, lengths))
+            self._texts = None
+        return self._starts, self._ends
+
+    def find_all(self, needle: str) -> List[int]:
+        """Ascending positions of the strings that contain ``needle``."""
+        if not needle:
+            return list(range(self.count))
+        blob = self.blob
+        i = blob.find(needle)
+        if i == -1:
+            return []
+        starts, ends = self._offsets()
+        result: List[int] = []
+        while i != -1:
+            pos = bisect_right(starts, i) - 1
+            if i + len(needle) <= ends[pos]:
+                result.append(pos)
+                # Continue with the next string
+                if pos + 1 == len(starts):
+                    break
+                i = blob.find(needle, starts[pos + 1])
+            else:
+                i = blob.find(needle, i + 1)
+        return result
+
+
+class SearchIndex:
+    """Inverted token index over the ``search_text`` of a list of tracks.
+
+    A query without whitespace can only occur inside a single
+    whitespace-delimited token of a haystack, so substring search reduces
+    to finding the vocabulary tokens that contain the query and taking the
+    union of their postings. Queries containing whitespace fall back to a
+    substring scan of all haystacks packed into one string.
+    """
+
+    def __init__(self, tracks: List[Track]):
+        self.tracks = tracks
+        # Packed haystacks for phrase queries, built on first use
+        self._haystacks: Optional[PackedStrings] = None
+        postings: Dict[str, List[int]] = {}
+        for pos, t in enumerate(tracks):
+            for token in set(t.search_text.split()):
+                postings.setdefault(token, []).append(pos)
+        self.postings = postings
+        # Vocabulary packed into one newline-separated string so a query can
+        # be located with str.find in C; starts[i] is the offset of vocab[i].
+        self.vocab = sorted(postings)
+        self.starts: List[int] = []
+        offset = 0
+        for token in self.vocab:
+            self.starts.append(offset)
+            offset += len(token) + 1
+        self.blob = "\n".join(self.vocab)
+
+    def search(self, query: str) -> List[Track]:
+        """Return tracks whose search_text contains ``query`` (already lowercased), in order."""
+        if not query:
+            return list(self.tracks)
+        if query != "".join(query.split()):
+            return self._scan_haystacks(query)
+
+        exact = self.postings.get(query)
+        positions = set(exact) if exact else set()
+        blob, starts, vocab = self.blob, self.starts, self.vocab
+        i = blob.find(query)
+        while i != -1:
+            idx = bisect_right(starts, i) - 1
+            token = vocab[idx]
+            if token != query:
+                positions.update(self.postings[token])
+            # Resume after this token; further hits inside it add nothing new
+            next_start = starts[idx + 1] if idx + 1 < len(starts) else len(blob)
+            i = blob.find(query, next_start)
+        tracks = self.tracks
+        return [tracks[pos] for pos in sorted(positions)]
+
+    def _scan_haystacks(self, query: str) -> List[Track]:
+        """Substring scan over all haystacks packed into one string."""
+        if self._haystacks is None:
+            self._haystacks = PackedStrings([t.search_text for t in self.tracks])
+        tracks = self.tracks
+        return [tracks[pos] for pos in self._haystacks.find_all(query)]
+
+
+def _positions_sorted_by(values: List[Any]) -> List[int]:
+    """Positions of the non-None ``values``, ordered by value then position.
+
+    Sorts plain ints with ``values.__getitem__`` as the key rather than
+    building a (value, position) tuple per entry; the stable sort keeps
+    equal values in position order, as the tuple comparison did.
+    """
+    positions = [pos for pos, value in enumerate(values) if value is not None]
+    positions.sort(key=values.__getitem__)
+    return positions
+
+
+class TrackColumns:
+    """Structure-of-arrays view of a list of tracks.
+
+    Hot scans (e.g. transition suggestions) walk these parallel columns
+    instead of touching every Track object, and BPM/year range filters are
+    bisects over the sorted secondary indexes. Keys are upper-cased and
+    interned to small ints: ``key_codes[i] == 0`` means no key.
+    """
+
+    def __init__(self, tracks: List[Track]):
+        self.tracks = tracks
+        self.ids = [t.id for t in tracks]
+        self.bpms = [t.bpm for t in tracks]
+        self.years = [t.year for t in tracks]
+        self.titles = [t.title or "" for t in tracks]
+        self.key_code_of: Dict[str, int] = {}
+        codes = self.key_code_of
+        self.key_codes = [
+            codes.setdefault(k, len(codes) + 1) if k else 0
+            for k in ((t.key or "").upper() for t in tracks)
+        ]
+
+        # Secondary indexes for range/key lookups: BPMs sorted with their
+        # positions, plus position lists per key code (0 = tracks without key)
+        # and for tracks without BPM.
+        self.sorted_bpm_positions = _positions_sorted_by(self.bpms)
+        self.sorted_bpms = [self.bpms[pos] for pos in self.sorted_bpm_positions]
+        self.no_bpm_positions = [pos for pos, bpm in enumerate(self.bpms) if bpm is None]
+        self.sorted_year_positions = _positions_sorted_by(self.years)
+        self.sorted_years = [self.years[pos] for pos in self.sorted_year_positions]
+        self.key_positions: Dict[int, List[int]] = {}
+        for pos, code in enumerate(self.key_codes):
+            self.key_positions.setdefault(code, []).append(pos)
+
+    def bpm_range_positions(self, low: float, high: float) -> List[int]:
+        """Positions of tracks whose BPM lies within [low, high]."""
+        lo = bisect_left(self.sorted_bpms, low)
+        hi = bisect_right(self.sorted_bpms, high)
+        return self.sorted_bpm_positions[lo:hi]
+
+    def year_range_positions(self, low: Optional[int], high: Optional[int]) -> List[int]:
+        """Positions of tracks with a year within [low, high], ascending by year.
+
+        A ``None`` bound is open; tracks without a year are never included.
+        """
+        lo = 0 if low is None else bisect_left(self.sorted_years, low)
+        hi = len(self.sorted_years) if high is None else bisect_right(self.sorted_years, high)
+        return self.sorted_year_positions[lo:hi]
+
+
+@dataclass(frozen=True, slots=True)
+class PlaylistProfile:
+    """Aggregate musical characteristics of a playlist, used for similarity.
+
+    ``genre_mask``/``key_mask`` encode the sets as bitmasks over per-library
+    genre/key ids, so set overlap is an integer AND plus a popcount.
+    """
+    track_count: int
+    genres: frozenset
+    keys: frozenset
+    avg_bpm: Optional[float]
+    genre_mask: int = 0
+    key_mask: int = 0
+
+
+def _bitmask(values, bit_of: Dict[str, int]) -> int:
+    """OR together one bit per value, assigning new bit ids as values appear."""
+    mask = 0
+    for value in values:
+        mask |= 1 << bit_of.setdefault(value, len(bit_of))
+    return mask
 
 
-@dataclass
+@dataclass(slots=True)
 class PlaylistFolder:
     """Represents a folder that can contain playlists and other folders."""
     id: str
     name: str
     parent_id: Optional[str] = None  # None means root level
-    playlist_ids: List[str] = field(default_factory=list)
-    subfolder_ids: List[str] = field(default_factory=list)
+    # Ordered sets (dict keys -> None): O(1) membership and removal, insertion order kept
+    playlist_ids: Dict[str, None] = field(default_factory=dict)
+    subfolder_ids: Dict[str, None] = field(default_factory=dict)
+    # Owning library, notified on field changes so its cached views stay fresh
+    _library: Optional["Library"] = field(default=None, init=False, repr=False, compare=False)
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            lib = getattr(self, "_library", None)
+            if lib is not None:
+                lib.invalidate_playlists()
 
-@dataclass
+
+class TrackIdList(list):
+    """List of track ids that tells its owning Playlist about in-place edits."""
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, iterable: Any = (), owner: Optional["Playlist"] = None):
+        super().__init__(iterable)
+        self._owner = owner
+
+    def _changed(self) -> None:
+        owner = getattr(self, "_owner", None)
+        if owner is not None:
+            owner._track_ids_changed()
+
+
+def _notify_after(name: str) -> Callable[..., Any]:
+    method = getattr(list, name)
+
+    def wrapper(self: TrackIdList, *args: Any, **kwargs: Any) -> Any:
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ("append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+              "__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(TrackIdList, _name, _notify_after(_name))
+
+
+@dataclass(slots=True)
 class Playlist:
     id: str
     name: str
+    # Stored as a TrackIdList so in-place edits also drop cached views
     track_ids: List[str] = field(default_factory=list)
     folder_id: Optional[str] = None  # Which folder this playlist belongs to
+    # frozenset(track_ids), built on first use
+    _track_id_set: Optional[frozenset] = field(default=None, init=False, repr=False, compare=False)
+    # Owning library, notified on field changes so its cached views stay fresh
+    _library: Optional["Library"] = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "track_ids" and not (isinstance(value, TrackIdList) and value._owner is self):
+            value = TrackIdList(value, self)
+        object.__setattr__(self, name, value)
+        if name == "track_ids":
+            object.__setattr__(self, "_track_id_set", None)
+        if not name.startswith("_"):
+            lib = getattr(self, "_library", None)
+            if lib is not None:
+                lib.invalidate_playlists()
+
+    def _track_ids_changed(self) -> None:
+        self._track_id_set = None
+        lib = getattr(self, "_library", None)
+        if lib is not None:
+            lib.invalidate_playlists()
+
+    @property
+    def track_id_set(self) -> frozenset:
+        """Membership set of ``track_ids``, built once and reused across requests."""
+        cached = self._track_id_set
+        if cached is None:
+            cached = frozenset(self.track_ids)
+            self._track_id_set = cached
+        return cached
 
 
-@dataclass
+@dataclass(slots=True)
 class Library:
     id: str
     name: str
@@ -47,56 +433,241 @@ class Library:
     playlists: Dict[str, Playlist] = field(default_factory=dict)
     folders: Dict[str, PlaylistFolder] = field(default_factory=dict)
     _track_index: Dict[str, Track] = field(default_factory=dict, init=False, repr=False)
+    _version: int = field(default=0, init=False, repr=False)
+    _playlist_version: int = field(default=0, init=False, repr=False)
+    _cache: Dict[str, Any] = field(default_factory=dict, init=False, repr=False)
+    # Multisets of tags / custom field keys across all tracks, kept up to date
+    # incrementally so listing them doesn't scan the library
+    _tag_counts: Counter = field(default_factory=Counter, init=False, repr=False)
+    _custom_field_key_counts: Counter = field(default_factory=Counter, init=False, repr=False)
+
+    @staticmethod
+    def _adjust_counts(counter: Counter, items, delta: int):
+        for item in items:
+            count = counter[item] + delta
+            if count > 0:
+                counter[item] = count
+            else:
+                del counter[item]
+
+    def _recount(self, field_name: str, old: Any, new: Any):
+        """Move a track's tags or custom field keys from ``old`` to ``new`` in the tallies."""
+        counter = self._tag_counts if field_name == "tags" else self._custom_field_key_counts
+        self._adjust_counts(counter, old or (), -1)
+        self._adjust_counts(counter, new or (), 1)
+
+    def all_tags(self) -> List[str]:
+        """Sorted unique tags used by any track; cached, so treat as read-only."""
+        return self.cached("all_tags", lambda: sorted(self._tag_counts))
+
+    def custom_field_keys(self) -> List[str]:
+        """Sorted unique custom field keys used by any track; cached, so treat
+        as read-only."""
+        return self.cached("custom_field_keys", lambda: sorted(self._custom_field_key_counts))
+
+    def update_custom_fields(self, track: Track, fields: Dict[str, Any]):
+        """Merge ``fields`` into a track's custom fields, keeping key tallies in sync."""
+        new_keys = [k for k in fields if k not in track.custom_fields]
+        self._adjust_counts(self._custom_field_key_counts, new_keys, 1)
+        track.custom_fields.update(fields)
+        self.invalidate()
+
+    def invalidate(self):
+        """Mark the tracks as changed so cached track views get recomputed."""
+        self._version += 1
+
+    def invalidate_playlists(self):
+        """Mark the playlists (or their folders) as changed so cached playlist
+        views get recomputed."""
+        self._playlist_version += 1
+
+    def etag(self) -> str:
+        """Weak HTTP validator for responses built from this library.
+
+        Changes whenever the tracks or playlists do, using the same stamps
+        as ``cached``.
+        """
+        return (
+            f'W/"{self.id}-{self._version}-{len(self.tracks)}'
+            f'-{self._playlist_version}-{len(self.playlists)}"'
+        )
+
+    def cached(self, name: str, compute: Callable[[], Any], scope: str = "tracks") -> Any:
+        """Return a derived view of the library, recomputing it only after a change.
+
+        ``scope`` says what the view is derived from: ``"tracks"``,
+        ``"playlists"`` or ``"all"`` (both). The track/playlist count is part of the stamp so
+        items added to ``self.tracks``/``self.playlists`` directly also
+        invalidate the view.
+        """
+        track_stamp = (self._version, len(self.tracks))
+        playlist_stamp = (self._playlist_version, len(self.playlists))
+        if scope == "playlists":
+            stamp = playlist_stamp
+        elif scope == "all":
+            stamp = track_stamp + playlist_stamp
+        else:
+            stamp = track_stamp
+        entry = self._cache.get(name)
+        if entry is None or entry[0] != stamp:
+            entry = (stamp, compute())
+            self._cache[name] = entry
+        return entry[1]
 
     def add_track(self, track: Track):
-        self.tracks.append(track)
-        self._track_index[track.id] = track
+        self.add_tracks([track])
+
+    def add_tracks(self, tracks: List[Track]):
+        """Add tracks in bulk, in order: the same as add_track per track, but
+        with one list extend, one index update and one cache invalidation."""
+        self.tracks.extend(tracks)
+        self._track_index.update({track.id: track for track in tracks})
+        for track in tracks:
+            track._library = self
+            if track.tags:
+                self._adjust_counts(self._tag_counts, track.tags, 1)
+            if track.custom_fields:
+                self._adjust_counts(self._custom_field_key_counts, track.custom_fields, 1)
+        self.invalidate()
+
+    @property
+    def tracks_by_id(self) -> Dict[str, Track]:
+        """Id -> track index maintained by add_track; treat as read-only."""
+        return self._track_index
 
     def get_track(self, track_id: str) -> Optional[Track]:
         """Get track by ID using optimized index."""
         return self._track_index.get(track_id)
 
+    def playlist_usage(self) -> Dict[str, List[Dict[str, str]]]:
+        """Map of track_id -> [{"id", "name"}] for every playlist using that track."""
+        def build() -> Dict[str, List[Dict[str, str]]]:
+            usage: Dict[str, List[Dict[str, str]]] = {}
+            for pid, pl in self.playlists.items():
+                entry = {"id": pid, "name": pl.name}
+                for tid in pl.track_ids:
+                    usage.setdefault(tid, []).append(entry)
+            return usage
+        return self.cached("playlist_usage", build, scope="playlists")
+
+    def playlist_profile(self, playlist_id: str) -> PlaylistProfile:
+        """Cached genre/key/BPM profile of a playlist's resolvable tracks."""
+        # Profiles plus the genre/key -> bit id tables they share; all are
+        # dropped together so masks from one generation are comparable
+        profiles, genre_bits, key_bits = self.cached(
+            "playlist_profiles", lambda: ({}, {}, {}), scope="all"
+        )
+        profile = profiles.get(playlist_id)
+        if profile is None:
+            # One index lookup per id, resolved and filtered in the same pass
+            tracks_by_id = self._track_index
+            tracks = [
+                t for tid in self.playlists[playlist_id].track_ids
+                if (t := tracks_by_id.get(tid)) is not None
+            ]
+            bpms = [t.bpm for t in tracks if t.bpm]
+            genres = frozenset(t.genre for t in tracks if t.genre)
+            keys = frozenset(t.key for t in tracks if t.key)
+            profile = PlaylistProfile(
+                track_count=len(tracks),
+                genres=genres,
+                keys=keys,
+                avg_bpm=sum(bpms) / len(bpms) if bpms else None,
+                genre_mask=_bitmask(genres, genre_bits),
+                key_mask=_bitmask(keys, key_bits),
+            )
+            profiles[playlist_id] = profile
+        return profile
+
+    def playlist_tracks(self, playlist_id: str) -> List[Track]:
+        """Library tracks that belong to a playlist, in library order.
+
+        Cached per playlist until the tracks change or the playlist's
+        membership set is rebuilt. Callers must not mutate the list.
+        """
+        resolved = self.cached("playlist_tracks", dict)
+        allowed = self.playlists[playlist_id].track_id_set
+        entry = resolved.get(playlist_id)
+        if entry is None or entry[0] is not allowed:
+            entry = (allowed, [t for t in self.tracks if t.id in allowed])
+            resolved[playlist_id] = entry
+        return entry[1]
+
+    def columns(self) -> TrackColumns:
+        """Cached structure-of-arrays view of the tracks."""
+        return self.cached("columns", lambda: TrackColumns(self.tracks))
+
+    def search_tracks(self, query: str) -> List[Track]:
+        """Tracks whose lowercased title/artist/file_path haystack contains ``query``."""
+        index = self.cached("search_index", lambda: SearchIndex(self.tracks))
+        return index.search(query)
+
+    def tracks_with_path_containing(self, needle: str) -> List[Track]:
+        """Tracks whose file_path contains ``needle``, in library order."""
+        paths = self.cached("file_paths", lambda: PackedStrings([t.file_path or "" for t in self.tracks]))
+        tracks = self.tracks
+        return [tracks[pos] for pos in paths.find_all(needle)]
+
     def add_playlist(self, name: str, track_ids: List[str], folder_id: Optional[str] = None) -> str:
         pid = str(uuid.uuid4())
-        self.playlists[pid] = Playlist(id=pid, name=name, track_ids=list(track_ids), folder_id=folder_id)
+        # Playlist wraps track_ids in a fresh TrackIdList, copying it once
+        playlist = Playlist(id=pid, name=name, track_ids=track_ids, folder_id=folder_id)
+        playlist._library = self
+        self.playlists[pid] = playlist
+        self.invalidate_playlists()
         
         # If playlist is in a folder, add it to that folder's playlist list
         if folder_id and folder_id in self.folders:
-            self.folders[folder_id].playlist_ids.append(pid)
+            self.folders[folder_id].playlist_ids[pid] = None
         
         return pid
     
     def add_folder(self, name: str, parent_id: Optional[str] = None) -> str:
         """Add a new folder to the library."""
         folder_id = str(uuid.uuid4())
-        self.folders[folder_id] = PlaylistFolder(id=folder_id, name=name, parent_id=parent_id)
+        folder = PlaylistFolder(id=folder_id, name=name, parent_id=parent_id)
+        folder._library = self
+        self.folders[folder_id] = folder
+        self.invalidate_playlists()
         
         # If this folder has a parent, add it to the parent's subfolder list
         if parent_id and parent_id in self.folders:
-            self.folders[parent_id].subfolder_ids.append(folder_id)
+            self.folders[parent_id].subfolder_ids[folder_id] = None
         
         return folder_id
     
     def get_folder_hierarchy(self) -> Dict[str, Any]:
-        """Get the complete folder hierarchy as a nested structure."""
+        """Get the complete folder hierarchy as a nested structure.
+
+        The result is cached until a playlist or folder changes; treat it as
+        read-only.
+        """
+        return self.cached("folder_hierarchy", self._build_folder_hierarchy, scope="playlists")
+
+    def _build_folder_hierarchy(self) -> Dict[str, Any]:
+        # Index children by parent once, in folder order, instead of
+        # rescanning every folder for each node of the tree
+        children: Dict[Optional[str], List[PlaylistFolder]] = {}
+        for folder in self.folders.values():
+            children.setdefault(folder.parent_id, []).append(folder)
+
         def build_folder_tree(folder_id: Optional[str] = None) -> List[Dict[str, Any]]:
             """Recursively build folder tree starting from given folder_id."""
             result = []
             
-            # Find all folders with this parent_id
-            for fid, folder in self.folders.items():
-                if folder.parent_id == folder_id:
-                    folder_data = {
-                        "id": folder.id,
-                        "name": folder.name,
-                        "playlists": [
-                            {"id": pid, "name": self.playlists[pid].name}
-                            for pid in folder.playlist_ids
-                            if pid in self.playlists
-                        ],
-                        "subfolders": build_folder_tree(folder.id)
-                    }
-                    result.append(folder_data)
+            # All folders with this parent_id
+            for folder in children.get(folder_id, ()):
+                folder_data = {
+                    "id": folder.id,
+                    "name": folder.name,
+                    "playlists": [
+                        {"id": pid, "name": self.playlists[pid].name}
+                        for pid in folder.playlist_ids
+                        if pid in self.playlists
+                    ],
+                    "subfolders": build_folder_tree(folder.id)
+                }
+                result.append(folder_data)
             
             return result
         
@@ -1,98 +1,363 @@
 
 from __future__ import annotations
-from typing import Tuple, List, Dict
+from typing import BinaryIO, Iterator, Tuple, List, Dict, Optional, Union
 from .models import Library, Track
+import codecs
+import itertools
+import re
+import sys
 import uuid
 import xml.etree.ElementTree as ET
 import csv
 import io
+from functools import lru_cache, partial
 
 # Default duration for tracks when not specified (5 minutes in seconds)
 DEFAULT_DURATION_SECONDS = 300
+# Bytes of an XML upload decoded and fed to the parser at a time
+XML_FEED_CHUNK_BYTES = 16 * 1024
 
+# Bytes of a text upload (M3U) decoded and split into lines at a time
+TEXT_READ_CHUNK_BYTES = 64 * 1024
 
-def detect_format(filename: str, content: bytes) -> str:
+# Length of the "#EXTINF:" marker that starts an M3U track info line
+EXTINF_PREFIX_LEN = len("#EXTINF:")
+# Bytes decoded at a time by detect_format while looking for the first line
+DETECT_HEAD_BYTES = 8 * 1024
+# Header columns that mark a CSV upload as a Serato export
+CSV_HEADER_CANDIDATES = ("Title", "Artist", "File", "Key", "BPM")
+# Leading signatures detect_format matches before searching the whole upload
+_FORMAT_MAGICS = (
+    (b"#EXTM3U", "m3u"),
+    (b"<DJ_PLAYLISTS", "rekordbox"),
+    (b"<NML", "traktor"),
+)
+# Bytes of an upload inspected for a leading signature
+MAGIC_HEAD_BYTES = 256
+# Every line boundary str.splitlines() recognises
+_LINE_BREAK_REGEX = re.compile(r"[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# Distinct numeric strings whose parsed value is remembered. BPMs, years and
+# durations repeat across a library, so tracks share one object per value
+NUMBER_CACHE_SIZE = 4096
+
+# Track ids only need to be unique within the process; a counter is much
+# cheaper per track than uuid4 (libraries keep uuid4 ids)
+_track_ids = itertools.count(1)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a low-cardinality field (artist, key) so tracks share one copy."""
+    return sys.intern(value) if value else value
+
+
+@lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def _to_float(value: Optional[str]) -> Optional[float]:
+    """``float(value)``, or None for an empty or unparsable value."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+@lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def _to_int(value: Optional[str], default: Optional[int] = None) -> Optional[int]:
+    """``int(value)``, or ``default`` for an empty or unparsable value."""
+    if not value:
+        return default
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def _byte_chunks(content: Union[bytes, BinaryIO], size: int) -> Iterator[bytes]:
+    """``content`` in pieces of at most ``size`` bytes, read from it if it is
+    a binary stream or sliced without copying if it is bytes."""
+    if hasattr(content, "read"):
+        return iter(partial(content.read, size), b"")
+    view = memoryview(content)
+    return (view[start:start + size] for start in range(0, len(view), size))
+
+
+def _decoded_lines(content: Union[bytes, BinaryIO]) -> Iterator[str]:
+    """The lines of ``content.decode(errors="ignore")``, split as
+    ``splitlines()`` does but with their line breaks kept, decoding one
+    ``TEXT_READ_CHUNK_BYTES`` chunk at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    # The unfinished last line, in pieces; each chunk is decoded and searched
+    # once, and the pieces are joined only when a line break arrives, so a
+    # line many chunks long costs time linear in its length
+    parts: List[str] = []
+    for chunk in _byte_chunks(content, TEXT_READ_CHUNK_BYTES):
+        part = decoder.decode(chunk)
+        parts.append(part)
+        if not _LINE_BREAK_REGEX.search(part):
+            continue
+        lines = "".join(parts).splitlines(keepends=True)
+        # The last line may go on in the next chunk, or be the "\r" of a
+        # "\r\n" split across two chunks
+        parts = [lines.pop()]
+        yield from lines
+    parts.append(decoder.decode(b"", final=True))
+    yield from "".join(parts).splitlines(keepends=True)
+
+
+class _LibraryXMLScan:
+    """Single-pass scan of a DJ library XML document, without building a tree.
+
+    ``parse`` yields ``(attrib, children)`` for each ``entry_tag`` child of
+    the first COLLECTION element (what ``root.find(".//COLLECTION")
+    .findall(entry_tag)`` returned), while the document is still being
+    parsed. ``children`` maps each of ``child_tags`` to the attributes of
+    the entry's first direct child with that tag, as ``entry.find(tag)``
+    did. The NODE elements inside the first PLAYLISTS are collected in
+    document order into ``nodes`` as ``(attrib, refs)``, ``refs`` being the
+    attributes of the node's direct ``ref_tag`` children; they are complete
+    once ``parse`` is exhausted.
+    """
+
+    def __init__(self, entry_tag: str, ref_tag: str, child_tags: Tuple[str, ...] = ()):
+        self.entry_tag = entry_tag
+        self.ref_tag = ref_tag
+        self.child_tags = child_tags
+        self.nodes: List[Tuple[Dict[str, str], List[Dict[str, str]]]] = []
+        # Finished entries not handed out yet
+        self._entries: List[Tuple[Dict[str, str], Dict[str, Dict[str, str]]]] = []
+        self._entry: Optional[Tuple[Dict[str, str], Dict[str, Dict[str, str]]]] = None
+        self._depth = 0
+        # Depth of the first COLLECTION / PLAYLISTS while it is open, else 0
+        self._collection_depth = 0
+        self._playlists_depth = 0
+        self._seen_collection = False
+        self._seen_playlists = False
+        # Per open element: its ref list if it is a playlist NODE, else None
+        self._open_refs: List[Optional[List[Dict[str, str]]]] = []
+
+    def parse(self, content: Union[bytes, BinaryIO]) -> Iterator[Tuple[Dict[str, str], Dict[str, Dict[str, str]]]]:
+        """Feed ``content`` to the parser and yield collection entries as they end.
+
+        ``content`` is either the raw bytes or a binary stream, which is read
+        ``XML_FEED_CHUNK_BYTES`` at a time so the file never has to be held
+        in memory. The bytes are decoded one chunk at a time (as UTF-8 with
+        invalid sequences dropped, like ``content.decode(errors="ignore")``),
+        so no decoded copy of the whole file is made either.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        parser = ET.XMLParser(target=self)
+        for chunk in _byte_chunks(content, XML_FEED_CHUNK_BYTES):
+            parser.feed(decoder.decode(chunk))
+            yield from self._drain()
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        yield from self._drain()
+
+    def _drain(self) -> Iterator[Tuple[Dict[str, str], Dict[str, Dict[str, str]]]]:
+        entries, self._entries = self._entries, []
+        yield from entries
+
+    # XMLParser target callbacks
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        depth = self._depth = self._depth + 1
+        open_refs = self._open_refs
+        refs = None
+        # ".//COLLECTION" and ".//PLAYLISTS" never match the root element
+        if depth > 1:
+            collection_depth = self._collection_depth
+            if collection_depth:
+                if depth == collection_depth + 1:
+                    if tag == self.entry_tag:
+                        self._entry = (attrib, {})
+                elif depth == collection_depth + 2 and self._entry is not None:
+                    if tag in self.child_tags:
+                        self._entry[1].setdefault(tag, attrib)
+            elif tag == "COLLECTION" and not self._seen_collection:
+                self._seen_collection = True
+                self._collection_depth = depth
+
+            if self._playlists_depth:
+                if tag == "NODE":
+                    refs = []
+                    self.nodes.append((attrib, refs))
+            elif tag == "PLAYLISTS" and not self._seen_playlists:
+                self._seen_playlists = True
+                self._playlists_depth = depth
+            if tag == self.ref_tag:
+                parent_refs = open_refs[-1]
+                if parent_refs is not None:
+                    parent_refs.append(attrib)
+        open_refs.append(refs)
+
+    def end(self, tag: str) -> None:
+        depth = self._depth
+        collection_depth = self._collection_depth
+        if collection_depth:
+            if depth == collection_depth + 1:
+                if self._entry is not None:
+                    self._entries.append(self._entry)
+                    self._entry = None
+            elif depth == collection_depth:
+                self._collection_depth = 0
+        if depth == self._playlists_depth:
+            self._playlists_depth = 0
+        self._open_refs.pop()
+        self._depth = depth - 1
+
+    def doctype(self, name: str, pubid: Optional[str], system: Optional[str]) -> None:
+        # DJ library exports never carry a DTD; refusing one as soon as it
+        # starts keeps entity-expansion payloads from ever being expanded
+        raise ET.ParseError("DTDs are not allowed in library files")
+
+    def close(self) -> None:
+        return None
+
+
+def _first_line_of(content: bytes) -> str:
+    """``content.decode(errors="ignore").splitlines()[0]`` (or "" if empty),
+    decoding only as far as the first line break."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    view = memoryview(content)
+    parts: List[str] = []
+    for start in range(0, len(view), DETECT_HEAD_BYTES):
+        part = decoder.decode(view[start:start + DETECT_HEAD_BYTES])
+        match = _LINE_BREAK_REGEX.search(part)
+        if match:
+            parts.append(part[:match.start()])
+            return "".join(parts)
+        parts.append(part)
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def _sniff_magic(content: bytes) -> Optional[str]:
+    """Format whose signature opens ``content``, skipping a UTF-8 BOM,
+    leading whitespace and an XML declaration; None if none matches."""
+    head = content[:MAGIC_HEAD_BYTES].removeprefix(codecs.BOM_UTF8).lstrip()
+    if head.startswith(b"<?xml"):
+        end = head.find(b"?>")
+        if end != -1:
+            head = head[end + 2:].lstrip()
+    for signature, fmt in _FORMAT_MAGICS:
+        if head.startswith(signature):
+            return fmt
+    return None
+
+
+def detect_format_head(filename: str, head: bytes) -> Optional[str]:
+    """Format settled by ``filename`` and the first ``MAGIC_HEAD_BYTES`` of
+    the upload (``head``), or None if detect_format has to search the whole
+    upload. It never answers differently from detect_format."""
     lower = (filename or "").lower()
-    text = content.decode(errors="ignore")
-    # Primary hints: file extension
     if lower.endswith(".m3u") or lower.endswith(".m3u8"):
         return "m3u"
+    if lower.endswith(".nml"):
+        return "traktor"
+    if lower.endswith(".csv"):
+        return None
+    magic = _sniff_magic(head)
+    if lower.endswith(".xml") and magic not in ("rekordbox", "traktor"):
+        return None
+    return magic
+
+
+def detect_format(filename: str, content: bytes) -> str:
+    lower = (filename or "").lower()
+    # The markers are ASCII, so searching the raw bytes finds them wherever
+    # the decoded text would, without decoding the whole upload. Uploads that
+    # open with a known signature, or whose extension settles the format, are
+    # decided from their first bytes; the substring searches remain for
+    # documents with a comment or doctype first
+    fmt = detect_format_head(filename, content[:MAGIC_HEAD_BYTES])
+    if fmt:
+        return fmt
+
     if lower.endswith(".xml"):
-        if "DJ_PLAYLISTS" in text:
+        if b"DJ_PLAYLISTS" in content:
             return "rekordbox"
-        if "<NML" in text:
+        if b"<NML" in content:
             return "traktor"
         return "xml"
-    if lower.endswith(".nml"):
-        return "traktor"
     if lower.endswith(".csv"):
         # Be stricter for CSV: require a header row that looks like a DJ library export
-        lines = text.splitlines()
-        first_line = lines[0].strip() if lines else ""
-        header_candidates = ["Title", "Artist", "File", "Key", "BPM"]
-        if any(col in first_line for col in header_candidates):
+        first_line = _first_line_of(content).strip()
+        if any(col in first_line for col in CSV_HEADER_CANDIDATES):
             return "serato"
         return "unknown"
 
     # Content-based hints
-    if "#EXTM3U" in text:
+    if b"#EXTM3U" in content:
         return "m3u"
-    if "<DJ_PLAYLISTS" in text:
+    if b"<DJ_PLAYLISTS" in content:
         return "rekordbox"
-    if "<NML" in text:
+    if b"<NML" in content:
         return "traktor"
 
     # Very loose CSV heuristic as last resort
-    lines = text.splitlines()
-    if lines:
-        first_line = lines[0].strip()
-        header_candidates = ["Title", "Artist", "File", "Key", "BPM"]
-        if "," in first_line and any(col in first_line for col in header_candidates):
-            return "serato"
+    first_line = _first_line_of(content).strip()
+    if "," in first_line and any(col in first_line for col in CSV_HEADER_CANDIDATES):
+        return "serato"
 
     return "unknown"
 
 
-def parse_m3u(filename: str, content: bytes) -> Tuple[Library, Dict]:
-    text = content.decode(errors="ignore")
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
+def parse_m3u(filename: str, content: Union[bytes, BinaryIO]) -> Tuple[Library, Dict]:
+    """Parse an M3U/M3U8 playlist from its bytes or a binary stream."""
     lib = Library(id=str(uuid.uuid4()), name=filename)
+    tracks: List[Track] = []
     current_title_artist = ("", "")
     duration = None
     playlist_track_ids: List[str] = []
 
-    for line in lines:
+    # Lines are decoded and stripped as they are reached, so neither the
+    # whole decoded text nor a list of its lines is ever built. strip() also
+    # removes the line break each one still carries
+    for raw_line in _decoded_lines(content):
+        # Directives and comments other than #EXTINF (#EXTM3U, #PLAYLIST:, ...)
+        # are dropped before paying for strip(); stripping never changes
+        # whether a line starts with "#"
+        if raw_line[:1] == "#" and not raw_line.startswith("#EXTINF:"):
+            continue
+        line = raw_line.strip()
+        if not line:
+            continue
         if line.startswith("#EXTINF:"):
             # #EXTINF:300,Artist - Title
+            # partition() splits without building lists; a missing comma or
+            # an unparsable duration drops the whole EXTINF entry
+            dur_str, comma, rest = line[EXTINF_PREFIX_LEN:].partition(",")
             try:
-                meta = line.split(":", 1)[1]
-                dur_str, rest = meta.split(",", 1)
-                duration = int(float(dur_str))
+                duration = int(float(dur_str)) if comma else None
+            except (ValueError, OverflowError):
+                duration = None
+            if duration is None:
+                current_title_artist = ("", "")
+            else:
                 if duration <= 0:
                     duration = None
-                if " - " in rest:
-                    artist, title = rest.split(" - ", 1)
-                else:
+                artist, dash, title = rest.partition(" - ")
+                if not dash:
                     artist, title = "", rest
                 # Don't strip() to preserve leading/trailing whitespace for CSV formula injection detection in exports
                 current_title_artist = (title, artist)
-            except Exception:
-                current_title_artist = ("", "")
-                duration = None
         elif not line.startswith("#"):
             file_path = line
             title, artist = current_title_artist
-            tid = str(uuid.uuid4())
+            tid = f"t{next(_track_ids)}"
             track = Track(
                 id=tid,
-                title=title or file_path.split("/")[-1],
-                artist=artist,
+                title=title or file_path.rpartition("/")[2],
+                artist=_intern(artist),
                 file_path=file_path,
                 duration_seconds=duration if duration and duration > 0 else DEFAULT_DURATION_SECONDS,
             )
-            lib.add_track(track)
+            tracks.append(track)
             playlist_track_ids.append(tid)
 
+    lib.add_tracks(tracks)
+
     # Single default playlist
     if playlist_track_ids:
         lib.add_playlist("Imported", playlist_track_ids)
@@ -107,49 +372,54 @@ def parse_m3u(filename: str, content: bytes) -> Tuple[Library, Dict]:
 
 def parse_serato_csv(filename: str, content: bytes) -> Tuple[Library, Dict]:
     try:
-        text = content.decode(errors="ignore")
-        reader = csv.DictReader(io.StringIO(text))
+        # Decoded lazily as the reader pulls lines, so no decoded copy of the
+        # whole file sits next to the bytes
+        text = io.TextIOWrapper(io.BytesIO(content), encoding="utf-8", errors="ignore", newline="")
+        reader = csv.reader(text)
         lib = Library(id=str(uuid.uuid4()), name=filename)
+        tracks: List[Track] = []
         playlist_ids: List[str] = []
 
+        # Resolve the columns once from the header. As with DictReader, the
+        # last of several same-named columns wins; a missing column gets an
+        # index no row reaches, so it reads as empty.
+        header = next(reader, [])
+        columns = {name: i for i, name in enumerate(header)}
+        title_col = columns.get("Title", sys.maxsize)
+        artist_col = columns.get("Artist", sys.maxsize)
+        file_col = columns.get("File", sys.maxsize)
+        key_col = columns.get("Key", sys.maxsize)
+        bpm_col = columns.get("BPM", sys.maxsize)
+        year_col = columns.get("Year", sys.maxsize)
+
         for row in reader:
-            title = row.get("Title", "") or ""
-            artist = row.get("Artist", "") or ""
-            file_path = row.get("File", "") or ""
-            key = row.get("Key", "") or ""
-            bpm = row.get("BPM") or None
-            year = row.get("Year") or None
-            tid = str(uuid.uuid4())
-            
-            # Handle BPM conversion with error handling
-            bpm_val = None
-            if bpm:
-                try:
-                    bpm_val = float(bpm)
-                except (ValueError, TypeError):
-                    bpm_val = None
-            
-            # Handle year conversion with error handling
-            year_val = None
-            if year:
-                try:
-                    year_val = int(year)
-                except (ValueError, TypeError):
-                    year_val = None
+            n = len(row)
+            if not n:
+                continue  # blank line, skipped like DictReader does
+            # csv.reader only yields strings, and the numeric helpers map an
+            # empty cell to None themselves
+            title = row[title_col] if title_col < n else ""
+            artist = row[artist_col] if artist_col < n else ""
+            file_path = row[file_col] if file_col < n else ""
+            key = row[key_col] if key_col < n else ""
+            bpm_val = _to_float(row[bpm_col]) if bpm_col < n else None
+            year_val = _to_int(row[year_col]) if year_col < n else None
+            tid = f"t{next(_track_ids)}"
             
             track = Track(
                 id=tid,
                 title=title,
-                artist=artist,
+                artist=_intern(artist),
                 file_path=file_path,
-                key=key,
+                key=_intern(key),
                 bpm=bpm_val,
                 year=year_val,
                 duration_seconds=DEFAULT_DURATION_SECONDS,
             )
-            lib.add_track(track)
+            tracks.append(track)
             playlist_ids.append(tid)
 
+        lib.add_tracks(tracks)
         if playlist_ids:
             lib.add_playlist("Imported", playlist_ids)
 
@@ -163,77 +433,51 @@ def parse_serato_csv(filename: str, content: bytes) -> Tuple[Library, Dict]:
         raise ValueError(f"Failed to parse Serato CSV: {str(e)}")
 
 
-def parse_rekordbox_xml(filename: str, content: bytes) -> Tuple[Library, Dict]:
+def parse_rekordbox_xml(filename: str, content: Union[bytes, BinaryIO]) -> Tuple[Library, Dict]:
+    """Parse a Rekordbox XML export from its bytes or a binary stream."""
     try:
-        text = content.decode(errors="ignore")
-        root = ET.fromstring(text)
         lib = Library(id=str(uuid.uuid4()), name=filename)
+        tracks: List[Track] = []
         id_to_trackid: Dict[str, str] = {}
 
-        collection = root.find(".//COLLECTION")
-        if collection is not None:
-            for track_el in collection.findall("TRACK"):
-                track_id = track_el.get("TrackID") or str(uuid.uuid4())
-                title = track_el.get("Name", "") or ""
-                artist = track_el.get("Artist", "") or ""
-                loc = track_el.get("Location", "") or ""
-                bpm = track_el.get("AverageBpm") or None
-                year = track_el.get("Year") or None
-                key = track_el.get("Tonality") or ""
-                
-                # Handle BPM conversion with error handling
-                bpm_val = None
-                if bpm:
-                    try:
-                        bpm_val = float(bpm)
-                    except (ValueError, TypeError):
-                        bpm_val = None
-                
-                # Handle year conversion with error handling
-                year_val = None
-                if year:
-                    try:
-                        year_val = int(year)
-                    except (ValueError, TypeError):
-                        year_val = None
-                
-                # Handle duration conversion with error handling
-                duration_val = DEFAULT_DURATION_SECONDS
-                duration_str = track_el.get("TotalTime")
-                if duration_str:
-                    try:
-                        duration_val = int(duration_str)
-                    except (ValueError, TypeError):
-                        duration_val = DEFAULT_DURATION_SECONDS
-                
-                tid = str(uuid.uuid4())
-                track = Track(
-                    id=tid,
-                    title=title,
-                    artist=artist,
-                    file_path=loc,
-                    bpm=bpm_val,
-                    year=year_val,
-                    key=key,
-                    duration_seconds=duration_val,
-                )
-                lib.add_track(track)
+        # Collection entries are handled while the document is still being
+        # parsed; playlist nodes are only kept as attributes and track refs
+        scan = _LibraryXMLScan("TRACK", ref_tag="TRACK")
+        append_track = tracks.append
+        for track_attrs, _ in scan.parse(content):
+            # Bound once per row; the attribute lookups below dominate the loop
+            get = track_attrs.get
+            track_id = get("TrackID")
+            tid = f"t{next(_track_ids)}"
+            append_track(Track(
+                id=tid,
+                title=get("Name", ""),
+                artist=_intern(get("Artist", "")),
+                file_path=get("Location", ""),
+                bpm=_to_float(get("AverageBpm")),
+                year=_to_int(get("Year")),
+                key=_intern(get("Tonality", "")),
+                duration_seconds=_to_int(get("TotalTime"), DEFAULT_DURATION_SECONDS),
+            ))
+            # Playlists can only reference tracks that have a TrackID
+            if track_id:
                 id_to_trackid[track_id] = tid
 
+        lib.add_tracks(tracks)
         playlist_count = 0
-        playlists_root = root.find(".//PLAYLISTS")
-        if playlists_root is not None:
-            for node in playlists_root.findall(".//NODE"):
-                if node.get("Type") == "1":  # playlist
-                    name = node.get("Name", "Playlist")
-                    tids: List[str] = []
-                    for track_ref in node.findall("TRACK"):
-                        key = track_ref.get("Key")
-                        if key and key in id_to_trackid:
-                            tids.append(id_to_trackid[key])
-                    if tids:
-                        lib.add_playlist(name, tids)
-                        playlist_count += 1
+        for node, track_refs in scan.nodes:
+            if node.get("Type") == "1":  # playlist
+                name = node.get("Name", "Playlist")
+                # Only truthy keys are ever mapped, so membership alone
+                # filters out refs without a key
+                tids = [
+                    id_to_trackid[key]
+                    for track_ref in track_refs
+                    if (key := track_ref.get("Key")) in id_to_trackid
+                ]
+                if tids:
+                    lib.add_playlist(name, tids)
+                    playlist_count += 1
 
         meta = {
             "source_format": "rekordbox_xml",
@@ -247,90 +491,82 @@ def parse_rekordbox_xml(filename: str, content: bytes) -> Tuple[Library, Dict]:
         raise ValueError(f"Failed to parse Rekordbox XML: {str(e)}")
 
 
-def parse_traktor_nml(filename: str, content: bytes) -> Tuple[Library, Dict]:
+def parse_traktor_nml(filename: str, content: Union[bytes, BinaryIO]) -> Tuple[Library, Dict]:
+    """Parse a Traktor NML collection from its bytes or a binary stream."""
     try:
-        text = content.decode(errors="ignore")
-        root = ET.fromstring(text)
         lib = Library(id=str(uuid.uuid4()), name=filename)
+        tracks: List[Track] = []
         id_to_trackid: Dict[str, str] = {}
 
-        collection = root.find(".//COLLECTION")
-        if collection is not None:
-            for entry in collection.findall("ENTRY"):
-                title = entry.get("TITLE", "") or ""
-                artist = entry.get("ARTIST", "") or ""
-                info = entry.find("INFO")
-                loc = entry.find("LOCATION")
-                
-                bpm = info.get("BPM") if info is not None else None
-                key = info.get("MUSICAL_KEY") if info is not None else ""
-                year = None
-                duration_seconds = DEFAULT_DURATION_SECONDS
-                
-                if info is not None:
-                    date = info.get("RELEASE_DATE")
-                    if date and len(date) >= 4:
-                        try:
-                            year = int(date[:4])
-                        except (ValueError, TypeError):
-                            year = None
-                    # Parse PLAYTIME field (in seconds)
-                    playtime = info.get("PLAYTIME")
-                    if playtime:
-                        try:
-                            # Check if it's an integer or float
-                            if '.' in playtime:
-                                duration_seconds = int(float(playtime))
-                            else:
-                                duration_seconds = int(playtime)
-                        except (ValueError, TypeError):
-                            duration_seconds = DEFAULT_DURATION_SECONDS
-                
-                # Handle BPM conversion with error handling
-                bpm_val = None
-                if bpm:
+        # Collection entries are handled while the document is still being
+        # parsed; playlist nodes are only kept as attributes and entry refs
+        scan = _LibraryXMLScan("ENTRY", ref_tag="ENTRY", child_tags=("INFO", "LOCATION"))
+        append_track = tracks.append
+        for entry, children in scan.parse(content):
+            title = entry.get("TITLE", "")
+            artist = entry.get("ARTIST", "")
+            info = children.get("INFO")
+            loc = children.get("LOCATION")
+            
+            bpm_val = None
+            key = ""
+            year = None
+            duration_seconds = DEFAULT_DURATION_SECONDS
+            
+            if info is not None:
+                info_get = info.get
+                bpm_val = _to_float(info_get("BPM"))
+                key = info_get("MUSICAL_KEY")
+                date = info_get("RELEASE_DATE")
+                if date and len(date) >= 4:
+                    year = _to_int(date[:4])
+                # Parse PLAYTIME field (in seconds)
+                playtime = info_get("PLAYTIME")
+                if playtime:
                     try:
-                        bpm_val = float(bpm)
+                        # Check if it's an integer or float
+                        if '.' in playtime:
+                            duration_seconds = int(float(playtime))
+                        else:
+                            duration_seconds = int(playtime)
                     except (ValueError, TypeError):
-                        bpm_val = None
-                
-                file_path = ""
-                if loc is not None:
-                    directory = loc.get("DIR", "") or ""
-                    file_name = loc.get("FILE", "") or ""
-                    file_path = directory + file_name
-                tid = str(uuid.uuid4())
-                track = Track(
-                    id=tid,
-                    title=title,
-                    artist=artist,
-                    file_path=file_path,
-                    bpm=bpm_val,
-                    year=year,
-                    key=key,
-                    duration_seconds=duration_seconds,
-                )
-                lib.add_track(track)
-                # Use file_path as the key for playlist references (more reliable than TITLE)
-                # If file_path is empty, fall back to TITLE
-                track_key = file_path if file_path else title
-                if track_key:
-                    id_to_trackid[track_key] = tid
+                        duration_seconds = DEFAULT_DURATION_SECONDS
+            
+            file_path = ""
+            if loc is not None:
+                file_path = loc.get("DIR", "") + loc.get("FILE", "")
+            tid = f"t{next(_track_ids)}"
+            append_track(Track(
+                id=tid,
+                title=title,
+                artist=_intern(artist),
+                file_path=file_path,
+                bpm=bpm_val,
+                year=year,
+                key=_intern(key),
+                duration_seconds=duration_seconds,
+            ))
+            # Use file_path as the key for playlist references (more reliable than TITLE)
+            # If file_path is empty, fall back to TITLE
+            track_key = file_path if file_path else title
+            if track_key:
+                id_to_trackid[track_key] = tid
 
+        lib.add_tracks(tracks)
         playlist_count = 0
-        playlists_root = root.find(".//PLAYLISTS")
-        if playlists_root is not None:
-            for node in playlists_root.findall(".//NODE"):
-                if node.get("TYPE", "").upper() == "PLAYLIST":
-                    name = node.get("NAME", "Playlist")
-                    tids: List[str] = []
-                    for entry_ref in node.findall("ENTRY"):
-                        key = entry_ref.get("KEY")
-                        if key and key in id_to_trackid:
-                            tids.append(id_to_trackid[key])
-                    if tids:
-                        lib.add_playlist(name, tids)
-                        playlist_count += 1
+        for node, entry_refs in scan.nodes:
+            if node.get("TYPE", "").upper() == "PLAYLIST":
+                name = node.get("NAME", "Playlist")
+                # Only truthy keys are ever mapped, so membership alone
+                # filters out refs without a key
+                tids = [
+                    id_to_trackid[key]
+                    for entry_ref in entry_refs
+                    if (key := entry_ref.get("KEY")) in id_to_trackid
+                ]
+                if tids:
+                    lib.add_playlist(name, tids)
+                    playlist_count += 1
 
         meta = {
             "source_format": "traktor_nml",
@@ -25,6 +25,17 @@ def _import_m3u_library():
     return data["library_id"], data
 
 
+def _import_large_m3u_library(count, title="Track {i}"):
+    lines = ["#EXTM3U"]
+    for i in range(count):
+        lines.append(f"#EXTINF:300,Artist {i} - " + title.format(i=i))
+        lines.append(f"/path/to/track{i}.mp3")
+    files = {"file": ("big.m3u", "\n".join(lines) + "\n", "audio/x-mpegurl")}
+    resp = client.post("/api/import", files=files)
+    assert resp.status_code == 200
+    return resp.json()["library_id"]
+
+
 def test_import_m3u_and_list_tracks():
     library_id, meta = _import_m3u_library()
     assert meta["track_count"] == 2
@@ -37,6 +48,27 @@ def test_import_m3u_and_list_tracks():
     assert "Second Track" in titles
 
 
+def test_import_routes_extensionless_uploads_by_content():
+    uploads = {
+        "m3u": b"#EXTM3U\n#EXTINF:300,Artist - Title\n/path/to/track.mp3\n",
+        "rekordbox_xml": b"""<?xml version="1.0" encoding="UTF-8"?>
+<DJ_PLAYLISTS Version="1.0"><COLLECTION Entries="1">
+<TRACK TrackID="1" Name="Title" Artist="Artist" /></COLLECTION></DJ_PLAYLISTS>""",
+        "traktor_nml": b"""<NML VERSION="19"><COLLECTION>
+<ENTRY TITLE="Title" ARTIST="Artist" /></COLLECTION></NML>""",
+    }
+    for source_format, content in uploads.items():
+        files = {"file": ("upload", content, "application/octet-stream")}
+        resp = client.post("/api/import", files=files)
+        assert resp.status_code == 200
+        assert resp.json()["source_format"] == source_format
+        assert resp.json()["track_count"] == 1
+
+    files = {"file": ("upload", b"neither a playlist nor a library", "application/octet-stream")}
+    resp = client.post("/api/import", files=files)
+    assert resp.status_code == 400
+
+
 def test_export_m3u_and_rekordbox_and_traktor():
     library_id, _ = _import_m3u_library()
 
@@ -53,3 +85,125 @@ def test_export_m3u_and_rekordbox_and_traktor():
     assert resp.status_code == 200
     text = resp.content.decode()
     assert "<NML" in text
+
+
+def test_rewrite_paths_preview_and_apply():
+    library_id, _ = _import_m3u_library()
+    body = {"search": "/path/to/first", "replace": "/music/first"}
+
+    resp = client.post(f"/api/library/{library_id}/preview_rewrite_paths", json=body)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["affected_tracks"] == 1
+    assert data["examples"][0]["new_path"] == "/music/first.mp3"
+
+    resp = client.post(f"/api/library/{library_id}/apply_rewrite_paths", json=body)
+    assert resp.status_code == 200
+    assert resp.json()["changed_tracks"] == 1
+
+    # Rewritten paths no longer match; the new prefix does
+    resp = client.post(f"/api/library/{library_id}/preview_rewrite_paths", json=body)
+    assert resp.json()["affected_tracks"] == 0
+    resp = client.post(
+        f"/api/library/{library_id}/preview_rewrite_paths",
+        json={"search": "/music/", "replace": "/"},
+    )
+    assert resp.json()["affected_tracks"] == 1
+
+
+def test_large_export_is_gzip_encoded():
+    library_id = _import_large_m3u_library(50)
+
+    resp = client.post(
+        f"/api/library/{library_id}/export",
+        params={"format": "rekordbox"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    # The client decodes the body transparently
+    assert resp.content.decode().count("<TRACK ") >= 50
+
+
+def test_streamed_xml_export_matches_rendered_export():
+    from backend.app import main
+    from backend.app.main import LIBRARIES, _render_export_tracks
+
+    # Titles need escaping, and 7 tracks span several 3-line batches
+    lib = LIBRARIES[_import_large_m3u_library(7, title="Track <{i}> & Co")]
+
+    old_batch = main.EXPORT_STREAM_BATCH_LINES
+    main.EXPORT_STREAM_BATCH_LINES = 3
+    try:
+        for fmt in ("rekordbox", "traktor"):
+            resp = client.post(f"/api/library/{lib.id}/export", params={"format": fmt})
+            assert resp.status_code == 200
+            assert resp.content.decode() == _render_export_tracks(lib.tracks, fmt)
+    finally:
+        main.EXPORT_STREAM_BATCH_LINES = old_batch
+
+
+def test_large_track_listing_is_streamed_whole():
+    from backend.app.main import TRACKS_STREAM_BATCH_SIZE
+
+    count = TRACKS_STREAM_BATCH_SIZE * 2 + 1
+    library_id = _import_large_m3u_library(count)
+
+    resp = client.get(f"/api/library/{library_id}/tracks")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    tracks = resp.json()
+    assert [t["title"] for t in tracks] == [f"Track {i}" for i in range(count)]
+
+    resp = client.get(
+        f"/api/library/{library_id}/tracks",
+        headers={"If-None-Match": resp.headers["etag"]},
+    )
+    assert resp.status_code == 304
+
+
+def test_apply_rewrite_paths_is_single_pass():
+    library_id, _ = _import_m3u_library()
+    # The replacement contains the search string; each path is rewritten once
+    body = {"search": "/path/", "replace": "/path/path/"}
+
+    resp = client.post(f"/api/library/{library_id}/apply_rewrite_paths", json=body)
+    assert resp.status_code == 200
+    assert resp.json()["changed_tracks"] == 2
+
+    tracks = client.get(f"/api/library/{library_id}/tracks").json()
+    assert sorted(t["file_path"] for t in tracks) == [
+        "/path/path/to/first.mp3",
+        "/path/path/to/second.mp3",
+    ]
+
+
+def test_tracks_not_modified_until_library_changes():
+    library_id, _ = _import_m3u_library()
+
+    resp = client.get(f"/api/library/{library_id}/tracks")
+    assert resp.status_code == 200
+    etag = resp.headers["etag"]
+
+    resp = client.get(f"/api/library/{library_id}/tracks", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    resp = client.get(f"/api/library/{library_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    body = {"search": "/path/", "replace": "/music/"}
+    client.post(f"/api/library/{library_id}/apply_rewrite_paths", json=body)
+
+    resp = client.get(f"/api/library/{library_id}/tracks", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert all(t["file_path"].startswith("/music/") for t in resp.json())
+
+
+def test_tracks_unknown_playlist_ignores_if_none_match():
+    library_id, _ = _import_m3u_library()
+    url = f"/api/library/{library_id}/tracks"
+    etag = client.get(url).headers["etag"]
+
+    for tag in (etag, "*"):
+        resp = client.get(url, params={"playlist_id": "missing"}, headers={"If-None-Match": tag})
+        assert resp.status_code == 404
@@ -42,6 +42,22 @@ def test_malformed_xml_traktor():
     assert resp.status_code == 400
 
 
+def test_truncated_xml_after_streamed_tracks():
+    """Test that XML cut off after many complete tracks is still rejected."""
+    tracks = "".join(
+        f'<TRACK TrackID="{i}" Name="Track {i}" Artist="Artist" TotalTime="300" />\n'
+        for i in range(2000)
+    )
+    content = f"""<?xml version="1.0"?>
+<DJ_PLAYLISTS>
+  <COLLECTION>
+{tracks}    <TRACK TrackID="2000" Name="Cut""".encode()
+    files = {"file": ("truncated.xml", content, "text/xml")}
+    resp = client.post("/api/import", files=files)
+    # The tracks parsed before the error must not produce a partial library
+    assert resp.status_code == 400
+
+
 def test_invalid_bpm_values_in_csv():
     """Test handling of invalid BPM values in Serato CSV."""
     content = b"""Title,Artist,File,Key,BPM,Year
@@ -82,6 +98,16 @@ Another Track,Artist 2,/path/to/file2.mp3,9A,150,2021"""
     assert len(tracks) == 2
 
 
+def test_csv_with_carriage_return_line_endings():
+    """Test that a Serato CSV using bare CR line endings imports."""
+    content = b"Title,Artist,File,Key,BPM,Year\rTest Track,Test Artist,/path/to/file.mp3,8A,120,2020\r"
+
+    files = {"file": ("test.csv", content, "text/csv")}
+    resp = client.post("/api/import", files=files)
+    assert resp.status_code == 200
+    assert resp.json()["track_count"] == 1
+
+
 def test_invalid_duration_in_rekordbox():
     """Test handling of invalid duration in Rekordbox XML."""
     content = b"""<?xml version="1.0" encoding="UTF-8"?>
@@ -155,6 +155,44 @@ def test_move_folder():
     assert parent2_folder["subfolders"][0]["name"] == "Child"
 
 
+def test_folder_hierarchy_reflects_changes_after_read():
+    """Test that the folder hierarchy is rebuilt after each kind of change."""
+    library_id = _import_test_library()
+
+    def hierarchy():
+        resp = client.get(f"/api/library/{library_id}/folders")
+        assert resp.status_code == 200
+        return resp.json()
+
+    parent_id = client.post(
+        f"/api/library/{library_id}/folders", json={"name": "Parent"}
+    ).json()["folder_id"]
+    child_id = client.post(
+        f"/api/library/{library_id}/folders", json={"name": "Child"}
+    ).json()["folder_id"]
+    assert [f["name"] for f in hierarchy()["folders"]] == ["Parent", "Child"]
+
+    client.post(
+        f"/api/library/{library_id}/folders/{child_id}/move",
+        json={"new_parent_id": parent_id},
+    )
+    folders = hierarchy()["folders"]
+    assert [f["name"] for f in folders] == ["Parent"]
+    assert [f["name"] for f in folders[0]["subfolders"]] == ["Child"]
+
+    client.delete(f"/api/library/{library_id}/folders/{child_id}")
+    assert hierarchy()["folders"][0]["subfolders"] == []
+
+    playlist_id = hierarchy()["playlists"][0]["id"]
+    client.post(
+        f"/api/library/{library_id}/playlists/{playlist_id}/move",
+        json={"folder_id": parent_id},
+    )
+    data = hierarchy()
+    assert data["playlists"] == []
+    assert [p["id"] for p in data["folders"][0]["playlists"]] == [playlist_id]
+
+
 def test_move_folder_circular_reference():
     """Test that moving a folder into its own subfolder is prevented."""
     library_id = _import_test_library()
@@ -325,6 +363,32 @@ def test_get_all_tags():
     assert "dark" in tags
 
 
+def test_get_all_tags_drops_replaced_tags():
+    """Test that tags no longer used by any track disappear from the library tags."""
+    library_id = _import_test_library()
+    
+    resp1 = client.get(f"/api/library/{library_id}/tracks")
+    tracks = resp1.json()
+    
+    client.post(
+        f"/api/library/{library_id}/tracks/{tracks[0]['id']}/tags",
+        json={"tags": ["techno", "peak-time"]}
+    )
+    client.post(
+        f"/api/library/{library_id}/tracks/{tracks[1]['id']}/tags",
+        json={"tags": ["techno"]}
+    )
+    # Replace the first track's tags
+    client.post(
+        f"/api/library/{library_id}/tracks/{tracks[0]['id']}/tags",
+        json={"tags": ["house"]}
+    )
+    
+    resp2 = client.get(f"/api/library/{library_id}/tags")
+    assert resp2.status_code == 200
+    assert resp2.json()["tags"] == ["house", "techno"]
+
+
 def test_get_custom_field_keys():
     """Test retrieving all custom field keys in the library."""
     library_id = _import_test_library()
@@ -441,3 +505,32 @@ def test_playlist_similarity_with_min_threshold():
     # With high threshold, may find fewer similar playlists
     assert "similar_playlists" in data
     assert isinstance(data["similar_playlists"], list)
+
+
+def test_playlist_similarity_reflects_later_changes():
+    """Cached similarity results are refreshed after tracks or playlists change."""
+    library_id = _import_test_library()
+    from backend.app.main import LIBRARIES
+
+    lib = LIBRARIES[library_id]
+    t0, t1, t2 = lib.tracks
+    t0.genre = "Techno"
+    t1.genre = "Techno"
+    t2.genre = "House"
+    source_id = lib.add_playlist("Source", [t0.id])
+    target_id = lib.add_playlist("Target", [t1.id])
+
+    url = f"/api/library/{library_id}/playlists/{source_id}/similar?min_similarity=0.9"
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert [p["playlist_id"] for p in resp.json()["similar_playlists"]] == [target_id]
+
+    # A renamed playlist shows its new name
+    lib.playlists[target_id].name = "Renamed"
+    resp = client.get(url)
+    assert [p["playlist_name"] for p in resp.json()["similar_playlists"]] == ["Renamed"]
+
+    # A track edit that breaks the overlap drops the match
+    t1.genre = "House"
+    resp = client.get(url)
+    assert resp.json()["similar_playlists"] == []
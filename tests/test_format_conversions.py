@@ -14,6 +14,7 @@ from fastapi.testclient import TestClient
 from backend.app.main import app
 from backend.app.parsers import (
     DEFAULT_DURATION_SECONDS,
+    detect_format,
     parse_m3u,
     parse_rekordbox_xml,
     parse_traktor_nml,
@@ -35,6 +36,84 @@ def test_m3u_negative_extinf_duration_defaults():
     assert lib.tracks[0].duration_seconds == DEFAULT_DURATION_SECONDS
 
 
+def test_m3u_lines_split_across_read_chunks():
+    """Test that M3U lines and characters cut by chunk reads parse whole."""
+    from backend.app import parsers
+
+    m3u_content = "#EXTM3U\r\n#EXTINF:300,Ärtist - Tïtle\r\n/music/tráck.mp3\r\n".encode()
+    expected = [("Tïtle", "Ärtist", "/music/tráck.mp3", 300)]
+
+    old_chunk = parsers.TEXT_READ_CHUNK_BYTES
+    parsers.TEXT_READ_CHUNK_BYTES = 3
+    try:
+        for content in (m3u_content, io.BytesIO(m3u_content)):
+            lib, meta = parse_m3u("test.m3u", content)
+            assert meta["track_count"] == 1
+            assert [
+                (t.title, t.artist, t.file_path, t.duration_seconds) for t in lib.tracks
+            ] == expected
+    finally:
+        parsers.TEXT_READ_CHUNK_BYTES = old_chunk
+
+
+def test_m3u_line_spanning_many_read_chunks():
+    """Test that a line many chunks long parses whole, in one piece."""
+    from backend.app import parsers
+
+    file_path = "/music/" + "ä" * 5000 + ".mp3"
+    m3u_content = f"#EXTM3U\n#EXTINF:300,Artist - Title\n{file_path}\r\n/music/next.mp3".encode()
+
+    old_chunk = parsers.TEXT_READ_CHUNK_BYTES
+    parsers.TEXT_READ_CHUNK_BYTES = 7
+    try:
+        for content in (m3u_content, io.BytesIO(m3u_content)):
+            lib, _ = parse_m3u("test.m3u", content)
+            assert [t.file_path for t in lib.tracks] == [file_path, "/music/next.mp3"]
+    finally:
+        parsers.TEXT_READ_CHUNK_BYTES = old_chunk
+
+
+def test_detect_format_prefers_leading_signature():
+    """Test that the signature opening an upload decides its format."""
+    rekordbox_xml = b"""\xef\xbb\xbf<?xml version="1.0" encoding="UTF-8"?>
+<DJ_PLAYLISTS Version="1.0">
+  <COLLECTION Entries="1">
+    <TRACK TrackID="1" Name="#EXTM3U &lt;NML mix" />
+  </COLLECTION>
+</DJ_PLAYLISTS>
+"""
+    assert detect_format("upload", rekordbox_xml) == "rekordbox"
+    assert detect_format("library.xml", rekordbox_xml) == "rekordbox"
+    assert detect_format("upload", b"<!-- exported -->\n<NML VERSION=\"19\"/>") == "traktor"
+    assert detect_format("upload", b"#EXTM3U\n/music/<NML>.mp3\n") == "m3u"
+
+
+def test_upload_with_known_signature_is_parsed_from_the_stream():
+    """Test that uploads settled by their first bytes are never read whole."""
+    from backend.app.main import _parse_upload
+
+    class ChunkedReads(io.BytesIO):
+        def read(self, size=-1):
+            assert size is not None and size >= 0, "upload read whole"
+            return super().read(size)
+
+    m3u_content = b"#EXTM3U\n#EXTINF:300,Artist - Title\n/music/track.mp3\n"
+    nml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+<NML VERSION="19"><COLLECTION>
+  <ENTRY TITLE="Title" ARTIST="Artist"><LOCATION DIR="/music/" FILE="track.mp3" /></ENTRY>
+</COLLECTION></NML>
+"""
+    for filename, content in (
+        ("test.m3u", m3u_content),
+        ("upload", m3u_content),
+        ("library.nml", nml_content),
+        ("upload", nml_content),
+    ):
+        lib, meta = _parse_upload(filename, ChunkedReads(content))
+        assert meta["track_count"] == 1
+        assert lib.tracks[0].title == "Title"
+
+
 def test_rekordbox_import_and_export():
     """Test that importing and exporting Rekordbox XML preserves all data."""
     rekordbox_xml = b"""<?xml version="1.0" encoding="UTF-8"?>
@@ -84,6 +163,113 @@ def test_rekordbox_import_and_export():
     assert lib2.tracks[1].duration_seconds == 240
 
 
+def test_rekordbox_playlists_before_collection():
+    """Test that playlists listed ahead of the collection still resolve."""
+    rekordbox_xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<DJ_PLAYLISTS Version="1.0">
+  <PLAYLISTS>
+    <NODE Type="0" Name="ROOT">
+      <NODE Name="Early" Type="1">
+        <TRACK Key="2"/>
+        <TRACK Key="1"/>
+      </NODE>
+    </NODE>
+  </PLAYLISTS>
+  <COLLECTION Entries="2">
+    <TRACK TrackID="1" Name="Track One" Artist="Artist One" TotalTime="300" />
+    <TRACK TrackID="2" Name="Track Two" Artist="Artist Two" TotalTime="240" />
+  </COLLECTION>
+</DJ_PLAYLISTS>
+"""
+
+    lib, meta = parse_rekordbox_xml("test.xml", rekordbox_xml)
+
+    assert [t.title for t in lib.tracks] == ["Track One", "Track Two"]
+    assert meta["playlist_count"] == 1
+    playlist = next(iter(lib.playlists.values()))
+    assert playlist.track_ids == [lib.tracks[1].id, lib.tracks[0].id]
+
+
+def test_rekordbox_nested_playlist_folders():
+    """Test that playlists inside nested folders are found in document order."""
+    rekordbox_xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<DJ_PLAYLISTS Version="1.0">
+  <COLLECTION Entries="2">
+    <TRACK TrackID="1" Name="Track One" Artist="Artist One" TotalTime="300" />
+    <TRACK TrackID="2" Name="Track Two" Artist="Artist Two" TotalTime="240" />
+  </COLLECTION>
+  <PLAYLISTS>
+    <NODE Type="0" Name="ROOT">
+      <NODE Type="0" Name="Folder">
+        <NODE Type="0" Name="Subfolder">
+          <NODE Name="Deep" Type="1">
+            <TRACK Key="1"/>
+          </NODE>
+        </NODE>
+        <NODE Name="Middle" Type="1">
+          <TRACK Key="2"/>
+          <TRACK Key="missing"/>
+        </NODE>
+      </NODE>
+      <NODE Name="Top" Type="1">
+        <TRACK Key="2"/>
+        <TRACK Key="1"/>
+      </NODE>
+    </NODE>
+  </PLAYLISTS>
+</DJ_PLAYLISTS>
+"""
+
+    lib, meta = parse_rekordbox_xml("test.xml", rekordbox_xml)
+
+    one, two = (t.id for t in lib.tracks)
+    assert meta["playlist_count"] == 3
+    assert [(p.name, p.track_ids) for p in lib.playlists.values()] == [
+        ("Deep", [one]),
+        ("Middle", [two]),
+        ("Top", [two, one]),
+    ]
+
+
+def test_xml_parsers_accept_binary_streams():
+    """Test that the XML parsers read a binary stream like the same bytes."""
+    rekordbox_xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<DJ_PLAYLISTS Version="1.0">
+  <COLLECTION Entries="1">
+    <TRACK TrackID="1" Name="Track One" Artist="Artist One" AverageBpm="128.00" />
+  </COLLECTION>
+  <PLAYLISTS>
+    <NODE Type="0" Name="ROOT">
+      <NODE Name="Set" Type="1"><TRACK Key="1"/></NODE>
+    </NODE>
+  </PLAYLISTS>
+</DJ_PLAYLISTS>
+"""
+    traktor_nml = b"""<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+<NML VERSION="19">
+  <COLLECTION>
+    <ENTRY TITLE="Track One" ARTIST="Artist One">
+      <INFO BPM="128.00" PLAYTIME="300" />
+      <LOCATION DIR="/Music/" FILE="track1.mp3" />
+    </ENTRY>
+  </COLLECTION>
+</NML>
+"""
+
+    for parse, content in (
+        (parse_rekordbox_xml, rekordbox_xml),
+        (parse_traktor_nml, traktor_nml),
+    ):
+        from_bytes, bytes_meta = parse("test", content)
+        from_stream, stream_meta = parse("test", io.BytesIO(content))
+
+        assert stream_meta == bytes_meta
+        assert [(t.title, t.artist, t.bpm, t.file_path) for t in from_stream.tracks] == [
+            (t.title, t.artist, t.bpm, t.file_path) for t in from_bytes.tracks
+        ]
+        assert len(from_stream.playlists) == len(from_bytes.playlists)
+
+
 def test_traktor_import_and_export():
     """Test that importing and exporting Traktor NML preserves all data."""
     traktor_nml = b"""<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
@@ -68,3 +68,22 @@ def test_metadata_issues_and_autofix():
 
     assert t0.key == "8A"
     assert t0.year is None
+
+
+def test_metadata_issues_reflect_later_track_changes():
+    library_id = _import_m3u_library()
+    from backend.app.main import LIBRARIES
+
+    lib = LIBRARIES[library_id]
+    t0 = lib.tracks[0]
+    t0.bpm = 128
+
+    resp = client.get(f"/api/library/{library_id}/metadata_issues")
+    assert resp.status_code == 200
+    assert t0.id not in resp.json()["issues"]["missing_bpm"]
+
+    # A cached result must not survive a change to the track
+    t0.bpm = None
+    resp = client.get(f"/api/library/{library_id}/metadata_issues")
+    assert resp.status_code == 200
+    assert t0.id in resp.json()["issues"]["missing_bpm"]
@@ -69,3 +69,23 @@ def test_generate_playlist_v2_filters_by_keys_and_keyword():
     assert resp.status_code == 200
     data = resp.json()
     assert data["track_count"] == 1
+
+
+def test_generate_playlist_v2_year_range_tracks_later_changes():
+    library_id = _import_m3u_library()
+    from backend.app.main import LIBRARIES
+
+    lib = LIBRARIES[library_id]
+    lib.tracks[0].year = 2005
+    lib.tracks[1].year = 2018
+    body = {"target_minutes": 10, "sort_by": "year", "min_year": 2000, "max_year": 2010}
+
+    resp = client.post(f"/api/library/{library_id}/generate_playlist_v2", json=body)
+    assert resp.status_code == 200
+    assert lib.playlists[resp.json()["playlist_id"]].track_ids == [lib.tracks[0].id]
+
+    # The year index must pick up edits made after it was built
+    lib.tracks[1].year = 2008
+    resp = client.post(f"/api/library/{library_id}/generate_playlist_v2", json=body)
+    assert resp.status_code == 200
+    assert lib.playlists[resp.json()["playlist_id"]].track_ids == [t.id for t in lib.tracks]
@@ -46,6 +46,42 @@ def test_global_search_returns_usage():
     assert "Warehouse" in playlist_names
 
 
+def test_global_search_usage_follows_in_place_playlist_edits():
+    library_id = _import_m3u_library()
+    from backend.app.main import LIBRARIES
+
+    lib = LIBRARIES[library_id]
+    t0, t1 = lib.tracks
+    pid = lib.add_playlist("Warehouse", [t1.id])
+
+    def usage_names():
+        resp = client.get(f"/api/library/{library_id}/search", params={"q": "first"})
+        assert resp.status_code == 200
+        return [p["name"] for p in resp.json()["results"][0]["playlists"]]
+
+    assert "Warehouse" not in usage_names()
+    # Same-length in-place edit, after the usage map was cached
+    lib.playlists[pid].track_ids[0] = t0.id
+    assert "Warehouse" in usage_names()
+
+
+def test_global_search_matches_substrings_and_phrases():
+    library_id = _import_m3u_library()
+
+    def search_titles(q):
+        resp = client.get(f"/api/library/{library_id}/search", params={"q": q})
+        assert resp.status_code == 200
+        return [r["track"]["title"] for r in resp.json()["results"]]
+
+    # Mid-word and cross-field matches keep plain substring semantics
+    assert search_titles("rehous") == ["Warehouse Anthem"]
+    assert search_titles("ANTHEM") == ["Warehouse Anthem"]
+    assert search_titles("first track") == ["First Track"]
+    assert search_titles("anthem artist") == ["Warehouse Anthem"]
+    assert search_titles("/path/to/") == ["First Track", "Warehouse Anthem"]
+    assert search_titles("nothing-here") == []
+
+
 def test_export_bundle_creates_zip_with_formats():
     library_id = _import_m3u_library()
 
@@ -105,3 +105,21 @@ def test_bundle_export_escapes_all_formats():
     
     # If we got a ZIP file, the escaping should be working
     assert len(resp.content) > 0
+
+
+def test_xml_import_rejects_entity_declarations():
+    """Test that XML imports with a DTD are rejected before entities expand."""
+    content = b"""<?xml version="1.0"?>
+<!DOCTYPE DJ_PLAYLISTS [
+  <!ENTITY lol "lol">
+  <!ENTITY lol2 "&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;">
+]>
+<DJ_PLAYLISTS>
+  <COLLECTION>
+    <TRACK TrackID="1" Name="&lol2;" Artist="Artist" />
+  </COLLECTION>
+</DJ_PLAYLISTS>
+"""
+    files = {"file": ("entities.xml", content, "text/xml")}
+    resp = client.post("/api/import", files=files)
+    assert resp.status_code == 400
@@ -173,6 +173,26 @@ def test_library_cleanup_and_deletion():
     assert resp.status_code == 404
 
 
+def test_least_recently_used_library_evicted_over_cap():
+    """Test that the library count is capped, dropping the least recently used."""
+    from backend.app import main
+
+    old_cap = main.MAX_LIBRARIES
+    main.MAX_LIBRARIES = 2
+    try:
+        first = _import_simple_library()
+        second = _import_simple_library()
+        # Touch the first library so the second becomes least recently used
+        assert client.get(f"/api/library/{first}").status_code == 200
+        third = _import_simple_library()
+
+        assert client.get(f"/api/library/{first}").status_code == 200
+        assert client.get(f"/api/library/{second}").status_code == 404
+        assert client.get(f"/api/library/{third}").status_code == 200
+    finally:
+        main.MAX_LIBRARIES = old_cap
+
+
 def test_empty_library_edge_cases():
     """Test edge cases with empty libraries."""
     # Import empty M3U